@@ -1,110 +1,180 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import boto3
-import json
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.sessions import SessionMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+import aioboto3
+from aiobotocore.config import AioConfig
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import orjson
 import os
+import secrets
 from dotenv import load_dotenv
 import logging
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+# Shared thread pool for the event loop's blocking helpers (e.g. DNS lookups
+# made by the async AWS client), allocated once instead of per call
+executor = ThreadPoolExecutor(max_workers=32)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Install the shared executor and open the per-process Bedrock client."""
+    asyncio.get_running_loop().set_default_executor(executor)
+    async with bedrock_agent_runtime_client() as client:
+        app.state.bedrock_agent_runtime = client
+        yield
+    executor.shutdown(wait=False)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Bedrock Agent Runtime client
-bedrock_agent_runtime = boto3.client(
-    'bedrock-agent-runtime',
-    region_name=os.getenv('AWS_REGION', 'us-east-1')
-)
-
 # Configuration from environment variables
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
 AGENT_ID = os.getenv('BEDROCK_AGENT_ID')
 AGENT_ALIAS_ID = os.getenv('BEDROCK_AGENT_ALIAS_ID', 'TSTALIASID')
+SESSION_SECRET_KEY = os.getenv('SESSION_SECRET_KEY')
+
+if not SESSION_SECRET_KEY:
+    logger.warning("SESSION_SECRET_KEY not set - chat sessions will not survive a server restart")
+    SESSION_SECRET_KEY = secrets.token_hex(32)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=['*'],
+    allow_methods=['*'],
+    allow_headers=['*']
+)
+# Signed session cookie - keeps each browser on the same Bedrock session so the
+# agent reuses its conversation context instead of rebuilding it every turn
+app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET_KEY, same_site='lax')
+
+# Async AWS session - one Bedrock client per process is opened from it at startup
+aws_session = aioboto3.Session()
+
+# Connection pool sized for many concurrent agent streams; adaptive retries
+# back off on throttling
+BEDROCK_CLIENT_CONFIG = AioConfig(
+    max_pool_connections=50,
+    retries={'max_attempts': 3, 'mode': 'adaptive'}
+)
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    """Handle chat requests from the frontend."""
+def bedrock_agent_runtime_client():
+    """Create an async Bedrock Agent Runtime client (use with `async with`)."""
+    return aws_session.client(
+        'bedrock-agent-runtime',
+        region_name=AWS_REGION,
+        config=BEDROCK_CLIENT_CONFIG
+    )
+
+def sse_event(event: str, data: dict) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+@app.post('/api/chat')
+async def chat(request: Request):
+    """Handle chat requests from the frontend, streaming the agent response."""
     try:
-        data = request.get_json()
-
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Message is required'}), 400
-
-        user_message = data['message']
-        session_id = data.get('sessionId', f'session-{os.urandom(8).hex()}')
-
-        logger.info(f"Received message: {user_message}")
-        logger.info(f"Session ID: {session_id}")
-
-        if not AGENT_ID:
-            return jsonify({
-                'error': 'Bedrock Agent not configured. Please set BEDROCK_AGENT_ID environment variable.'
-            }), 500
-
-        # Invoke Bedrock Agent
-        response = bedrock_agent_runtime.invoke_agent(
-            agentId=AGENT_ID,
-            agentAliasId=AGENT_ALIAS_ID,
-            sessionId=session_id,
-            inputText=user_message
-        )
-
-        # Process the response stream
-        agent_response = ""
-        for event in response['completion']:
-            if 'chunk' in event:
-                chunk = event['chunk']
-                if 'bytes' in chunk:
-                    agent_response += chunk['bytes'].decode('utf-8')
-
-        logger.info(f"Agent response: {agent_response}")
-
-        return jsonify({
-            'response': agent_response,
-            'sessionId': session_id,
-            'metadata': {
-                'agentId': AGENT_ID,
-                'aliasId': AGENT_ALIAS_ID
-            }
-        })
-
-    except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}")
-        return jsonify({
-            'error': f'Failed to process request: {str(e)}'
-        }), 500
-
-@app.route('/api/health', methods=['GET'])
-def health():
+        data = await request.json()
+    except Exception:
+        data = None
+
+    if not isinstance(data, dict) or 'message' not in data:
+        return JSONResponse({'error': 'Message is required'}, status_code=400)
+
+    user_message = data['message']
+    # Reuse the browser's sticky session; only its first message generates an ID
+    session_id = data.get('sessionId') or request.session.get('bedrock_session_id')
+    if not session_id:
+        session_id = f'session-{secrets.token_hex(8)}'
+    request.session['bedrock_session_id'] = session_id
+
+    logger.info(f"Received message: {user_message}")
+    logger.info(f"Session ID: {session_id}")
+
+    if not AGENT_ID:
+        return JSONResponse({
+            'error': 'Bedrock Agent not configured. Please set BEDROCK_AGENT_ID environment variable.'
+        }, status_code=500)
+
+    client = request.app.state.bedrock_agent_runtime
+
+    async def generate():
+        response_length = 0
+        try:
+            # Invoke Bedrock Agent
+            response = await client.invoke_agent(
+                agentId=AGENT_ID,
+                agentAliasId=AGENT_ALIAS_ID,
+                sessionId=session_id,
+                inputText=user_message
+            )
+
+            # Forward each completion chunk as soon as it arrives
+            async for event in response['completion']:
+                if 'chunk' in event:
+                    chunk = event['chunk']
+                    if 'bytes' in chunk:
+                        text = chunk['bytes'].decode('utf-8')
+                        response_length += len(text)
+                        yield sse_event('chunk', {'text': text})
+
+            logger.info(f"Agent response length: {response_length} characters")
+
+            yield sse_event('done', {
+                'sessionId': session_id,
+                'metadata': {
+                    'agentId': AGENT_ID,
+                    'aliasId': AGENT_ALIAS_ID
+                }
+            })
+
+        except Exception as e:
+            logger.error(f"Error in chat endpoint: {str(e)}")
+            yield sse_event('error', {
+                'error': f'Failed to process request: {str(e)}'
+            })
+
+    # Stop proxies (CRA dev proxy, nginx) from compressing or buffering the stream
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache, no-transform', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.get('/api/health')
+async def health():
     """Health check endpoint."""
-    return jsonify({
+    return {
         'status': 'healthy',
         'agent_configured': bool(AGENT_ID),
-        'region': os.getenv('AWS_REGION', 'us-east-1')
-    })
+        'region': AWS_REGION
+    }
 
-@app.route('/api/config', methods=['GET'])
-def config():
+@app.get('/api/config')
+async def config():
     """Get configuration information."""
-    return jsonify({
+    return {
         'agent_id': AGENT_ID,
         'agent_alias_id': AGENT_ALIAS_ID,
-        'region': os.getenv('AWS_REGION', 'us-east-1'),
+        'region': AWS_REGION,
         'configured': bool(AGENT_ID)
-    })
+    }
 
 if __name__ == '__main__':
+    import uvicorn
+
     port = int(os.getenv('PORT', 3001))
-    debug = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
+    reload = os.getenv('RELOAD', 'false').lower() == 'true'
 
-    logger.info(f"Starting Flask server on port {port}")
+    logger.info(f"Starting FastAPI server on port {port}")
     logger.info(f"Agent ID: {AGENT_ID}")
     logger.info(f"Agent Alias ID: {AGENT_ALIAS_ID}")
 
     # Bind to localhost only for security - not accessible from other devices
-    app.run(host='127.0.0.1', port=port, debug=debug)
+    uvicorn.run('backend_server:app', host='127.0.0.1', port=port, reload=reload)
@@ -60,6 +60,6 @@ echo ""
 echo "🎯 Next Steps:"
 echo "  1. Update your .env file with the Bedrock Agent ID and Alias ID"
 echo "  2. Run 'npm start' in the frontend directory to start the React app"
-echo "  3. Run 'python backend_server.py' to start the backend API server"
+echo "  3. Run 'gunicorn -c gunicorn.conf.py backend_server:app' to start the backend API server"
 echo ""
 echo "🔗 Your web crawler agent is ready to use!"
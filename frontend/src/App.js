@@ -16,6 +16,10 @@ function App() {
     setMessages(prev => [...prev, { ...message, timestamp: new Date() }]);
   };
 
+  const updateLastMessage = (updates) => {
+    setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], ...updates }]);
+  };
+
   const handleSendMessage = async (userMessage) => {
     // Add user message
     addMessage({
@@ -32,9 +36,9 @@ function App() {
         headers: {
           'Content-Type': 'application/json',
         },
+        // The Bedrock session is tracked by the backend's session cookie
         body: JSON.stringify({
-          message: userMessage,
-          sessionId: generateSessionId()
+          message: userMessage
         }),
       });
 
@@ -42,14 +46,64 @@ function App() {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
+      // Read the server-sent event stream, growing the agent message as chunks arrive
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let agentContent = '';
+      let started = false;
 
-      // Add agent response
-      addMessage({
-        type: 'agent',
-        content: data.response || 'I apologize, but I encountered an error processing your request.',
-        metadata: data.metadata
-      });
+      const handleEvent = (rawEvent) => {
+        let eventType = 'message';
+        let eventData = '';
+        rawEvent.split('\n').forEach(line => {
+          if (line.startsWith('event: ')) {
+            eventType = line.slice(7);
+          } else if (line.startsWith('data: ')) {
+            eventData += line.slice(6);
+          }
+        });
+        if (!eventData) {
+          return;
+        }
+
+        const data = JSON.parse(eventData);
+        if (eventType === 'chunk') {
+          agentContent += data.text;
+          if (!started) {
+            started = true;
+            setIsLoading(false);
+            addMessage({ type: 'agent', content: agentContent });
+          } else {
+            updateLastMessage({ content: agentContent });
+          }
+        } else if (eventType === 'done') {
+          if (!started) {
+            started = true;
+            addMessage({
+              type: 'agent',
+              content: 'I apologize, but I encountered an error processing your request.'
+            });
+          }
+          updateLastMessage({ metadata: data.metadata });
+        } else if (eventType === 'error') {
+          throw new Error(data.error);
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+          break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          handleEvent(buffer.slice(0, boundary));
+          buffer = buffer.slice(boundary + 2);
+        }
+      }
 
     } catch (error) {
       console.error('Error calling agent:', error);
@@ -62,10 +116,6 @@ function App() {
     }
   };
 
-  const generateSessionId = () => {
-    return `session-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`;
-  };
-
   return (
     <div className="App">
       <header className="App-header">
@@ -0,0 +1,23 @@
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+# Load environment variables before reading PORT / WEB_CONCURRENCY
+load_dotenv()
+
+# Production server for backend_server:app
+#   gunicorn -c gunicorn.conf.py backend_server:app
+
+# Bind to localhost only for security - not accessible from other devices
+bind = f"127.0.0.1:{os.getenv('PORT', 3001)}"
+
+# Async uvicorn workers - each multiplexes many streaming chat requests
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Import the app once in the master so every worker shares the same module
+# state (e.g. the generated session secret when SESSION_SECRET_KEY is unset)
+preload_app = True
+
+# Agent responses can stream for a while; keep idle keep-alive connections open
+keepalive = 30
@@ -1,29 +1,94 @@
-import json
+import orjson
 import requests
-import gzip
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util.retry import Retry
 import io
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+import html
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from cachetools import TTLCache
 import boto3
 import os
+import re
 import logging
-from typing import Dict, Any
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 # Configure logging
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())  # DEBUG logs full event/response payloads
 
 # Configuration
 MAX_CONTENT_SIZE = int(os.environ.get('MAX_CONTENT_SIZE', 1024 * 1024))  # 1MB default
 TIMEOUT = int(os.environ.get('REQUEST_TIMEOUT', 30))  # 30 seconds default
+MAX_SCRAPE_WORKERS = int(os.environ.get('MAX_SCRAPE_WORKERS', 10))  # Concurrent scrapes per batch
+MAX_BATCH_URLS = int(os.environ.get('MAX_BATCH_URLS', 10))  # URLs accepted per batch request
+META_READ_SIZE = 16 * 1024  # Bytes read for metadata-only scrapes
+MAX_TEXT_LENGTH = 10000  # Limit to 10k characters for processing (shared across a batch)
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 3600))  # 1 hour default
+CACHE_TABLE_NAME = os.environ.get('CACHE_TABLE_NAME')  # Optional DynamoDB table (partition key: url)
+
+# Content types worth downloading and parsing; anything else is rejected up front
+SUPPORTED_CONTENT_TYPES = {'text/html', 'application/xhtml+xml', 'text/plain'}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Shared HTTP session - defined at module scope so warm Lambda containers
+# reuse pooled keep-alive connections instead of re-handshaking per scrape
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+)
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
+
+# Collapses any run of whitespace when cleaning extracted text
+_WS = re.compile(r'\s+')
+
+# Separators in Bedrock's '[a, b]' list form - only commas followed by a new URL
+_URL_LIST_SEP_RE = re.compile(r',\s*(?=https?://)')
+
+# Matches the first http(s) URL in free-form input text
+_URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+
+# Title / meta description patterns for the metadata-only fast path. The
+# description tag may list name and content in either order, and its content
+# runs to the matching closing quote, so it can contain the other quote kind
+_TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+_META_DESC_RE = re.compile(
+    rb'<meta(?=[^>]*?\sname\s*=\s*(["\']?)description\1[\s/>])'
+    rb'[^>]*?\scontent\s*=\s*(["\'])(?P<content>.*?)\2',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Scrape cache keyed by normalized URL - the in-memory cache survives across
+# warm invocations, the optional DynamoDB table across cold starts
+_CACHE = TTLCache(maxsize=512, ttl=CACHE_TTL)
+_CACHE_LOCK = threading.Lock()  # TTLCache is not thread-safe; batch scrapes share it
+_CACHE_TABLE = boto3.resource('dynamodb').Table(CACHE_TABLE_NAME) if CACHE_TABLE_NAME else None
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler for web scraping functionality.
     This function will be registered as a Bedrock tool.
     """
-    # Log the incoming event for debugging
-    logger.info(f"Received event: {json.dumps(event, indent=2)}")
+    # Log the incoming event for debugging (full payloads only at DEBUG level)
+    logger.info(f"Received event: actionGroup={event.get('actionGroup')}, apiPath={event.get('apiPath')}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Received event: {orjson.dumps(event).decode()}")
     logger.info(f"Context: request_id={context.aws_request_id}, function_name={context.function_name}")
 
     try:
@@ -36,8 +101,18 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         # Extract URL from different possible input formats
         url = None
+        urls = []
+        mode = 'full'
         if isinstance(request_body, dict):
             url = request_body.get('url') or request_body.get('website_url')
+            urls = parse_url_list(request_body.get('urls'))
+            mode = request_body.get('mode') or mode
+
+        # Batch request: scrape all URLs concurrently
+        if len(urls) > 1:
+            return handle_batch_scrape(urls, mode)
+
+        url = url or (urls[0] if urls else None)
 
         if not url and input_data:
             # Try to extract URL from input text
@@ -47,19 +122,21 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         if not url:
             response = create_error_response("No valid URL provided. Please provide a URL to scrape.")
-            logger.info(f"Returning error response (no URL): {json.dumps(response, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Returning error response (no URL): {orjson.dumps(response).decode()}")
             return response
 
         # Validate URL
         if not is_valid_url(url):
             response = create_error_response(f"Invalid URL format: {url}")
-            logger.info(f"Returning error response (invalid URL): {json.dumps(response, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Returning error response (invalid URL): {orjson.dumps(response).decode()}")
             return response
 
-        logger.info(f"Starting to scrape URL: {url}")
+        logger.info(f"Starting to scrape URL: {url} (mode: {mode})")
 
         # Perform web scraping
-        scraped_content = scrape_website(url)
+        scraped_content = scrape_website(url, mode)
 
         logger.info(f"Scraping result: success={scraped_content.get('success')}")
         if scraped_content.get('success'):
@@ -69,84 +146,190 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             logger.error(f"Scraping failed: {scraped_content.get('error')}")
 
         response = create_success_response(scraped_content)
-        logger.info(f"Final response being returned: {json.dumps(response, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Final response being returned: {orjson.dumps(response).decode()}")
         return response
 
     except Exception as e:
         logger.exception(f"Unexpected error in lambda_handler: {str(e)}")
         response = create_error_response(f"Error scraping website: {str(e)}")
-        logger.info(f"Returning exception response: {json.dumps(response, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Returning exception response: {orjson.dumps(response).decode()}")
+        return response
+
+def handle_batch_scrape(urls: List[str], mode: str = 'full') -> Dict[str, Any]:
+    """Validate and scrape several URLs, returning one combined response."""
+    if len(urls) > MAX_BATCH_URLS:
+        response = create_error_response(f"Too many URLs: {len(urls)} (max: {MAX_BATCH_URLS})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Returning error response (too many URLs): {orjson.dumps(response).decode()}")
+        return response
+
+    invalid_urls = [u for u in urls if not is_valid_url(u)]
+    if invalid_urls:
+        response = create_error_response(f"Invalid URL format: {', '.join(invalid_urls)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Returning error response (invalid URL): {orjson.dumps(response).decode()}")
         return response
 
+    logger.info(f"Starting to scrape {len(urls)} URLs (mode: {mode})")
+
+    # Split the text budget so the combined response stays within the agent's limits
+    results = scrape_websites(urls, MAX_TEXT_LENGTH // len(urls), mode)
+
+    succeeded = sum(1 for result in results if result.get('success'))
+    logger.info(f"Batch scraping result: {succeeded}/{len(urls)} succeeded")
+
+    response = create_batch_success_response(urls, results)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Final response being returned: {orjson.dumps(response).decode()}")
+    return response
+
+def parse_url_list(value: Any) -> List[str]:
+    """Parse a list of URLs (a JSON array, or Bedrock's '[a, b]' string form)."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            parsed = orjson.loads(value)
+        except ValueError:
+            parsed = None
+        value = parsed if isinstance(parsed, list) else _URL_LIST_SEP_RE.split(value.strip().strip('[]'))
+    return [u.strip().strip('"\'') for u in value if isinstance(u, str) and u.strip().strip('"\'')]
+
+def limit_content(result: Dict[str, Any], text_limit: int) -> Dict[str, Any]:
+    """Trim a full scrape result to a smaller text budget."""
+    content = result.get('content', '')
+    if text_limit >= MAX_TEXT_LENGTH or len(content) <= text_limit:
+        return result
+
+    content = content[:text_limit] + "... [content truncated]"
+    return {**result, 'content': content, 'content_length': len(content)}
+
 def extract_url_from_text(text: str) -> str:
     """Extract URL from input text."""
-    import re
-    url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-    matches = re.findall(url_pattern, text)
-    return matches[0] if matches else None
+    match = _URL_RE.search(text)
+    return match.group(0) if match else None
 
 def is_valid_url(url: str) -> bool:
     """Validate URL format."""
     try:
         result = urlparse(url)
-        return all([result.scheme, result.netloc])
+        return bool(result.scheme) and bool(result.netloc)
     except Exception:
         return False
 
-def scrape_website(url: str) -> Dict[str, Any]:
+def normalize_url(url: str) -> str:
+    """Normalize URL for cache lookups (lowercase host, drop fragment, sort query)."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+def get_cached_scrape(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Look up a cached scrape, falling back to the DynamoDB table if configured."""
+    with _CACHE_LOCK:
+        entry = _CACHE.get(cache_key)
+    if entry is not None or _CACHE_TABLE is None:
+        return entry
+
+    try:
+        item = _CACHE_TABLE.get_item(Key={'url': cache_key}).get('Item')
+    except Exception as e:
+        logger.warning(f"Cache table lookup failed: {str(e)}")
+        return None
+
+    if not item or int(item.get('expires_at', 0)) < time.time():
+        return None
+
+    entry = orjson.loads(item['entry'])
+    with _CACHE_LOCK:
+        _CACHE[cache_key] = entry
+    return entry
+
+def store_cached_scrape(cache_key: str, entry: Dict[str, Any]) -> None:
+    """Store a scrape in the cache, and in the DynamoDB table if configured."""
+    with _CACHE_LOCK:
+        _CACHE[cache_key] = entry
+    if _CACHE_TABLE is None:
+        return
+
+    try:
+        _CACHE_TABLE.put_item(Item={
+            'url': cache_key,
+            'entry': orjson.dumps(entry).decode(),
+            'expires_at': int(time.time()) + CACHE_TTL
+        })
+    except Exception as e:
+        logger.warning(f"Cache table write failed: {str(e)}")
+
+def scrape_website(url: str, mode: str = 'full', text_limit: int = MAX_TEXT_LENGTH) -> Dict[str, Any]:
     """
     Main web scraping function with proper error handling.
+    Page text is cut at text_limit characters.
+    In 'meta' mode only the title and meta description are extracted.
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
+    # Metadata-only scrapes bypass the cache, which holds full results
+    cache_key = normalize_url(url)
+    cached = get_cached_scrape(cache_key) if mode != 'meta' else None
+
+    # Revalidate cached pages with a conditional request
+    conditional_headers = {}
+    if cached:
+        if cached.get('etag'):
+            conditional_headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            conditional_headers['If-Modified-Since'] = cached['last_modified']
 
     try:
         # Make request with proper error handling
-        response = requests.get(
+        response = _SESSION.get(
             url,
-            headers=headers,
+            headers=conditional_headers,
             timeout=TIMEOUT,
             allow_redirects=True,
             stream=True
         )
         response.raise_for_status()
 
+        # Page unchanged since it was cached - skip download and parsing
+        if cached and response.status_code == 304:
+            response.close()
+            logger.info(f"Cache hit (not modified): {url}")
+            return limit_content(cached['result'], text_limit)
+
+        # Reject non-HTML payloads (PDFs, images, JSON...) before downloading the body
+        content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+        if content_type and content_type not in SUPPORTED_CONTENT_TYPES:
+            response.close()
+            return {
+                'success': False,
+                'error': f'Unsupported content type: {content_type}'
+            }
+
+        # Metadata-only fast path - skip the full download and HTML parse
+        if mode == 'meta':
+            head = response.raw.read(META_READ_SIZE, decode_content=True)
+            response.close()
+            return extract_metadata(url, head, response.url)
+
         # Check content size
         content_length = response.headers.get('content-length')
         if content_length and int(content_length) > MAX_CONTENT_SIZE:
+            response.close()
             return {
                 'success': False,
                 'error': f'Content too large: {content_length} bytes (max: {MAX_CONTENT_SIZE})'
             }
 
-        # Handle content properly - collect as bytes first
-        content_bytes = b''
-        total_size = 0
-
-        for chunk in response.iter_content(chunk_size=8192):
-            total_size += len(chunk)
-            if total_size > MAX_CONTENT_SIZE:
-                return {
-                    'success': False,
-                    'error': f'Content too large: exceeded {MAX_CONTENT_SIZE} bytes'
-                }
-            content_bytes += chunk
-
-        # Handle gzip decompression if needed
-        if response.headers.get('content-encoding') == 'gzip':
-            try:
-                content_bytes = gzip.decompress(content_bytes)
-            except Exception as e:
-                return {
-                    'success': False,
-                    'error': f'Failed to decompress gzip content: {str(e)}'
-                }
+        # Read the body in one call - urllib3 transparently decodes gzip/deflate/br,
+        # so the size limit applies to the decoded content
+        content_bytes = response.raw.read(MAX_CONTENT_SIZE + 1, decode_content=True)
+        if len(content_bytes) > MAX_CONTENT_SIZE:
+            response.close()
+            return {
+                'success': False,
+                'error': f'Content too large: exceeded {MAX_CONTENT_SIZE} bytes'
+            }
 
         # Decode to string
         try:
@@ -158,32 +341,26 @@ def scrape_website(url: str) -> Dict[str, Any]:
             }
 
         # Parse and clean HTML
-        soup = BeautifulSoup(content, 'html.parser')
+        tree = LexborHTMLParser(content)
 
         # Remove script and style elements
-        for script in soup(["script", "style", "nav", "header", "footer"]):
-            script.decompose()
+        for node in tree.css('script, style, nav, header, footer'):
+            node.decompose()
 
-        # Extract text content
-        text_content = soup.get_text()
-
-        # Clean up whitespace
-        lines = (line.strip() for line in text_content.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        clean_text = ' '.join(chunk for chunk in chunks if chunk)
-
-        # Limit text length
-        if len(clean_text) > 10000:  # Limit to 10k characters for processing
-            clean_text = clean_text[:10000] + "... [content truncated]"
+        # Extract text content, stopping once the length limit is reached
+        clean_text, truncated = extract_text(tree.body, text_limit) if tree.body else ('', False)
+        if truncated:
+            clean_text += "... [content truncated]"
 
         # Extract metadata
-        title = soup.find('title')
-        title_text = title.string.strip() if title else "No title found"
+        title = tree.css_first('title')
+        title_text = title.text(strip=True) if title else ''
+        title_text = title_text or "No title found"
 
-        meta_description = soup.find('meta', attrs={'name': 'description'})
-        description = meta_description.get('content', '') if meta_description else ''
+        meta_description = tree.css_first('meta[name="description"]')
+        description = (meta_description.attributes.get('content') or '') if meta_description else ''
 
-        return {
+        result = {
             'success': True,
             'url': url,
             'title': title_text,
@@ -193,12 +370,25 @@ def scrape_website(url: str) -> Dict[str, Any]:
             'final_url': response.url  # In case of redirects
         }
 
+        # Only full-length pages with validators are cached (they can be revalidated
+        # and trimmed for any smaller budget)
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if (etag or last_modified) and text_limit >= MAX_TEXT_LENGTH:
+            store_cached_scrape(cache_key, {
+                'etag': etag,
+                'last_modified': last_modified,
+                'result': result
+            })
+
+        return result
+
     except requests.exceptions.Timeout:
         return {
             'success': False,
             'error': f'Request timeout after {TIMEOUT} seconds'
         }
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
         return {
             'success': False,
             'error': f'Request failed: {str(e)}'
@@ -209,6 +399,52 @@ def scrape_website(url: str) -> Dict[str, Any]:
             'error': f'Parsing error: {str(e)}'
         }
 
+def extract_metadata(url: str, head: bytes, final_url: str) -> Dict[str, Any]:
+    """Extract title and meta description from the start of an HTML document."""
+    title_match = _TITLE_RE.search(head)
+    title_text = html.unescape(title_match.group(1).decode('utf-8', errors='ignore')) if title_match else ''
+    title_text = _WS.sub(' ', title_text).strip() or "No title found"
+
+    description_match = _META_DESC_RE.search(head)
+    description = html.unescape(description_match.group('content').decode('utf-8', errors='ignore')) if description_match else ''
+
+    return {
+        'success': True,
+        'url': url,
+        'title': title_text,
+        'description': description,
+        'content': description,
+        'content_length': len(description),
+        'final_url': final_url
+    }
+
+def extract_text(root: LexborNode, limit: int) -> Tuple[str, bool]:
+    """
+    Collect whitespace-normalized text from the text nodes under root.
+    Stops as soon as `limit` characters are collected; returns (text, truncated).
+    """
+    buf = io.StringIO()
+    for node in root.traverse(include_text=True):
+        if node.tag != '-text':
+            continue
+
+        text = _WS.sub(' ', node.text(deep=False)).strip()
+        if not text:
+            continue
+
+        if buf.tell():
+            buf.write(' ')
+        buf.write(text)
+        if buf.tell() > limit:
+            return buf.getvalue()[:limit], True
+
+    return buf.getvalue(), False
+
+def scrape_websites(urls: List[str], text_limit: int = MAX_TEXT_LENGTH, mode: str = 'full') -> List[Dict[str, Any]]:
+    """Scrape several URLs concurrently, returning results in input order."""
+    with ThreadPoolExecutor(max_workers=min(MAX_SCRAPE_WORKERS, len(urls))) as executor:
+        return list(executor.map(scrape_website, urls, [mode] * len(urls), [text_limit] * len(urls)))
+
 def create_success_response(scraped_data: Dict[str, Any]) -> Dict[str, Any]:
     """Create successful response for Bedrock Agent."""
     logger.info(f"Creating success response for scraped_data: {scraped_data.get('success')}")
@@ -225,7 +461,7 @@ Content:
 
     response = {
         'statusCode': 200,
-        'body': json.dumps({
+        'body': orjson.dumps({
             'response': {
                 'actionGroup': 'web_scrape',
                 'function': 'scrape_website',
@@ -237,10 +473,48 @@ Content:
                     }
                 }
             }
-        })
+        }).decode()
     }
 
-    logger.info(f"Created response structure: {json.dumps(response, indent=2)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Created response structure: {orjson.dumps(response).decode()}")
+    return response
+
+def create_batch_success_response(urls: List[str], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create combined response for a batch of scraped websites."""
+    logger.info(f"Creating batch response for {len(results)} scraped websites")
+
+    sections = []
+    for url, scraped_data in zip(urls, results):
+        if scraped_data.get('success'):
+            sections.append(f"""Successfully scraped: {scraped_data['title']}
+URL: {scraped_data['url']}
+Content length: {scraped_data['content_length']} characters
+
+Content:
+{scraped_data['content']}""")
+        else:
+            sections.append(f"Failed to scrape {url}: {scraped_data.get('error', 'Unknown error')}")
+
+    response = {
+        'statusCode': 200,
+        'body': orjson.dumps({
+            'response': {
+                'actionGroup': 'web_scrape',
+                'function': 'scrape_website',
+                'functionResponse': {
+                    'responseBody': {
+                        'TEXT': {
+                            'body': "\n\n---\n\n".join(sections)
+                        }
+                    }
+                }
+            }
+        }).decode()
+    }
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Created batch response structure: {orjson.dumps(response).decode()}")
     return response
 
 def create_error_response(error_message: str) -> Dict[str, Any]:
@@ -249,7 +523,7 @@ def create_error_response(error_message: str) -> Dict[str, Any]:
 
     response = {
         'statusCode': 200,
-        'body': json.dumps({
+        'body': orjson.dumps({
             'response': {
                 'actionGroup': 'web_scrape',
                 'function': 'scrape_website',
@@ -261,8 +535,9 @@ def create_error_response(error_message: str) -> Dict[str, Any]:
                     }
                 }
             }
-        })
+        }).decode()
     }
 
-    logger.info(f"Created error response structure: {json.dumps(response, indent=2)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Created error response structure: {orjson.dumps(response).decode()}")
     return response
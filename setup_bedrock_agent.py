@@ -1,43 +1,104 @@
 import boto3
+from botocore.exceptions import ClientError
 import json
 import os
+import random
 from dotenv import load_dotenv
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 import time
 
 # Load environment variables
 load_dotenv()
 
+# Error codes worth retrying - throttling and transient service faults
+RETRYABLE_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'InternalServerException',
+    'ServiceUnavailableException'
+}
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Check whether an AWS API error is throttling or a 5xx server error."""
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code')
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return code in RETRYABLE_ERROR_CODES or status >= 500
+
 class BedrockAgentSetup:
     def __init__(self):
         self.bedrock_agent = boto3.client('bedrock-agent', region_name=os.getenv('AWS_REGION', 'us-east-1'))
         self.lambda_client = boto3.client('lambda', region_name=os.getenv('AWS_REGION', 'us-east-1'))
 
+        # Lookups of existing resources, listed once and indexed by name
+        self._agent_index = None
+        self._action_group_index = {}
+        self._alias_index = {}
+
+    def _list_all(self, operation: str, result_key: str, **kwargs) -> list:
+        """List every item of a paginated Bedrock Agent list operation."""
+        paginator = self.bedrock_agent.get_paginator(operation)
+        return [item for page in paginator.paginate(**kwargs) for item in page.get(result_key, [])]
+
+    def get_agent_index(self) -> dict:
+        """Get existing agents keyed by agent name."""
+        if self._agent_index is None:
+            agents = self._list_all('list_agents', 'agentSummaries')
+            self._agent_index = {agent['agentName']: agent for agent in agents}
+        return self._agent_index
+
+    def get_action_group_index(self, agent_id: str) -> dict:
+        """Get the DRAFT action groups of an agent keyed by action group name."""
+        if agent_id not in self._action_group_index:
+            action_groups = self._list_all(
+                'list_agent_action_groups', 'actionGroupSummaries',
+                agentId=agent_id, agentVersion="DRAFT"
+            )
+            self._action_group_index[agent_id] = {ag['actionGroupName']: ag for ag in action_groups}
+        return self._action_group_index[agent_id]
+
+    def get_alias_index(self, agent_id: str) -> dict:
+        """Get the aliases of an agent keyed by alias name."""
+        if agent_id not in self._alias_index:
+            aliases = self._list_all('list_agent_aliases', 'agentAliasSummaries', agentId=agent_id)
+            self._alias_index[agent_id] = {alias['agentAliasName']: alias for alias in aliases}
+        return self._alias_index[agent_id]
+
+    @retry(
+        retry=retry_if_exception(is_retryable_error),
+        wait=wait_exponential_jitter(initial=1, max=15),
+        stop=stop_after_attempt(5),
+        reraise=True
+    )
+    def get_agent_status(self, agent_id: str) -> dict:
+        """Get the agent, retrying transient API errors."""
+        return self.bedrock_agent.get_agent(agentId=agent_id)
+
     def wait_for_agent_ready(self, agent_id: str, max_wait_time: int = 300):
-        """Wait for the agent to be in a ready state."""
+        """Wait for the agent to be in a ready state, polling with exponential backoff."""
         print(f"Waiting for agent {agent_id} to be ready...")
-        start_time = time.time()
+        deadline = time.time() + max_wait_time
+        delay = 1.0
 
-        while time.time() - start_time < max_wait_time:
-            try:
-                response = self.bedrock_agent.get_agent(agentId=agent_id)
-                agent_status = response['agent']['agentStatus']
-                print(f"Agent status: {agent_status}")
-
-                if agent_status in ['NOT_PREPARED', 'PREPARED', 'FAILED']:
-                    if agent_status == 'FAILED':
-                        raise Exception(f"Agent creation failed: {response.get('failureReasons', [])}")
-                    print(f"✅ Agent is ready with status: {agent_status}")
-                    return True
-                elif agent_status in ['CREATING', 'UPDATING', 'PREPARING']:
-                    print(f"Agent still {agent_status.lower()}... waiting 10 seconds")
-                    time.sleep(10)
-                else:
-                    print(f"Unknown agent status: {agent_status}")
-                    time.sleep(10)
+        while time.time() < deadline:
+            response = self.get_agent_status(agent_id)
+            agent_status = response['agent']['agentStatus']
+            print(f"Agent status: {agent_status}")
 
-            except Exception as e:
-                print(f"Error checking agent status: {e}")
-                time.sleep(10)
+            if agent_status == 'FAILED':
+                raise Exception(f"Agent creation failed: {response['agent'].get('failureReasons', [])}")
+            if agent_status in ['NOT_PREPARED', 'PREPARED']:
+                print(f"✅ Agent is ready with status: {agent_status}")
+                return True
+
+            if agent_status in ['CREATING', 'UPDATING', 'PREPARING']:
+                print(f"Agent still {agent_status.lower()}... waiting {delay:.1f} seconds")
+            else:
+                print(f"Unknown agent status: {agent_status}")
+
+            time.sleep(min(delay, max(0, deadline - time.time())))
+            delay = min(delay * 1.7, 15) + random.uniform(0, 0.5)
 
         raise Exception(f"Agent did not become ready within {max_wait_time} seconds")
 
@@ -48,40 +109,23 @@ class BedrockAgentSetup:
 
         # Check if agent already exists
         try:
-            existing_agents = self.bedrock_agent.list_agents()
-            existing_agent = None
-            print(f"Found {len(existing_agents.get('agentSummaries', []))} existing agents")
-
-            for agent in existing_agents.get('agentSummaries', []):
-                print(f"Checking agent: {agent.get('agentName')} (ID: {agent.get('agentId')})")
-                if agent['agentName'] == agent_name:
-                    existing_agent = agent
-                    print(f"✅ Found existing agent: {agent['agentId']}")
-                    break
-
-            # Also check if we have a specific agent ID we know about
-            if not existing_agent:
-                # Try to get the agent directly if we know it exists
-                try:
-                    test_response = self.bedrock_agent.get_agent(agentId="CCZNEDALHD")
-                    if test_response['agent']['agentName'] == agent_name:
-                        existing_agent = {
-                            'agentId': 'CCZNEDALHD',
-                            'agentName': agent_name
-                        }
-                        print(f"✅ Found existing agent by direct lookup: CCZNEDALHD")
-                except Exception as e:
-                    print(f"Direct agent lookup failed: {e}")
+            agent_index = self.get_agent_index()
+            print(f"Found {len(agent_index)} existing agents")
+
+            existing_agent = agent_index.get(agent_name)
+            if existing_agent:
+                print(f"✅ Found existing agent: {existing_agent['agentId']}")
 
         except Exception as e:
             print(f"Error checking existing agents: {e}")
-            existing_agents = {'agentSummaries': []}
             existing_agent = None
 
         agent_instruction = """
         You are a web scraping assistant. Your primary function is to help users scrape and analyze web content.
         
         When a user asks you to scrape a website or provides a URL, use the web_scrape tool to fetch the content.
+        When several URLs are provided, scrape them together with a single batch request.
+        When only a page's title or description is needed, scrape it with mode 'meta'.
         
         You can:
         1. Scrape web pages and extract clean text content
@@ -122,6 +166,8 @@ class BedrockAgentSetup:
                 foundationModel="anthropic.claude-3-sonnet-20240229-v1:0"
             )
             agent_id = response['agent']['agentId']
+            if self._agent_index is not None:
+                self._agent_index[agent_name] = response['agent']
 
             # Wait for creation to complete
             self.wait_for_agent_ready(agent_id)
@@ -172,6 +218,11 @@ class BedrockAgentSetup:
                                             "url": {
                                                 "type": "string",
                                                 "description": "The URL to scrape"
+                                            },
+                                            "mode": {
+                                                "type": "string",
+                                                "enum": ["full", "meta"],
+                                                "description": "'full' (default) returns the page text; 'meta' returns only the title and description"
                                             }
                                         },
                                         "required": ["url"]
@@ -206,21 +257,63 @@ class BedrockAgentSetup:
                             }
                         }
                     }
+                },
+                "/scrape-batch": {
+                    "post": {
+                        "summary": "Scrape multiple websites",
+                        "description": "Scrape content from several URLs concurrently and return clean text for each",
+                        "operationId": "scrape_websites",
+                        "requestBody": {
+                            "required": True,
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "urls": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "string"
+                                                },
+                                                "maxItems": 10,
+                                                "description": "The URLs to scrape (at most 10)"
+                                            },
+                                            "mode": {
+                                                "type": "string",
+                                                "enum": ["full", "meta"],
+                                                "description": "'full' (default) returns each page's text; 'meta' returns only titles and descriptions"
+                                            }
+                                        },
+                                        "required": ["urls"]
+                                    }
+                                }
+                            }
+                        },
+                        "responses": {
+                            "200": {
+                                "description": "Successful response",
+                                "content": {
+                                    "application/json": {
+                                        "schema": {
+                                            "type": "object",
+                                            "properties": {
+                                                "content": {
+                                                    "type": "string"
+                                                }
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
                 }
             }
         }
 
-        # Check if action group exists - now properly including agentVersion
+        # Check if action group exists
         try:
-            existing_action_groups = self.bedrock_agent.list_agent_action_groups(
-                agentId=agent_id,
-                agentVersion="DRAFT"
-            )
-            existing_action_group = None
-            for ag in existing_action_groups.get('actionGroupSummaries', []):
-                if ag['actionGroupName'] == action_group_name:
-                    existing_action_group = ag
-                    break
+            existing_action_group = self.get_action_group_index(agent_id).get(action_group_name)
         except Exception as e:
             print(f"Error checking existing action groups: {e}")
             existing_action_group = None
@@ -246,7 +339,7 @@ class BedrockAgentSetup:
             # Create new action group
             print("Creating action group...")
 
-            self.bedrock_agent.create_agent_action_group(
+            response = self.bedrock_agent.create_agent_action_group(
                 agentId=agent_id,
                 agentVersion="DRAFT",
                 actionGroupName=action_group_name,
@@ -258,6 +351,8 @@ class BedrockAgentSetup:
                     'payload': json.dumps(api_schema)
                 }
             )
+            if agent_id in self._action_group_index:
+                self._action_group_index[agent_id][action_group_name] = response['agentActionGroup']
 
     def create_or_update_alias(self, agent_id: str) -> str:
         """Create or update agent alias."""
@@ -266,12 +361,7 @@ class BedrockAgentSetup:
 
         # Check if alias exists
         try:
-            existing_aliases = self.bedrock_agent.list_agent_aliases(agentId=agent_id)
-            existing_alias = None
-            for alias in existing_aliases.get('agentAliasSummaries', []):
-                if alias['agentAliasName'] == alias_name:
-                    existing_alias = alias
-                    break
+            existing_alias = self.get_alias_index(agent_id).get(alias_name)
         except Exception as e:
             print(f"Error checking existing aliases: {e}")
             existing_alias = None
@@ -297,6 +387,8 @@ class BedrockAgentSetup:
                 description="Live alias for web crawler agent"
             )
             alias_id = response['agentAlias']['agentAliasId']
+            if agent_id in self._alias_index:
+                self._alias_index[agent_id][alias_name] = response['agentAlias']
 
         return alias_id
 